@@ -1,3 +1,4 @@
+import copy
 import functools
 import json
 import os
@@ -7,6 +8,7 @@ import random
 from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 import fire
+import joblib
 import numpy as np
 import pandas as pd
 import sklearn
@@ -17,9 +19,20 @@ import sklearn.model_selection
 import sklearn.multiclass
 import sklearn.preprocessing
 import sklearn.utils
+import threadpoolctl
 import xgboost as xgb
 
-from .utils import save_metrics
+from .utils import (
+    binary_roc_auc,
+    booster_to_classifier,
+    get_worker_threads,
+    get_xgb_device,
+    get_xgb_n_jobs,
+    load_features,
+    load_splits,
+    read_split,
+    save_metrics,
+)
 
 sklearn.set_config(enable_metadata_routing=True)
 
@@ -41,6 +54,56 @@ def train_log_regression(
     )
 
 
+def train_log_regression_sgd(
+    x_train: np.ndarray,
+    y_train: np.ndarray,
+    x_eval: np.ndarray,
+    y_eval: np.ndarray,
+    sample_weight: Optional[np.ndarray | None] = None,
+) -> sklearn.base.BaseEstimator:
+    alpha_values = [1e-5, 1e-4, 1e-3]
+    best_score = -np.inf
+
+    for alpha_value in alpha_values:
+        print(f"Testing alpha value: {alpha_value}", flush=True)
+        next_model = sklearn.linear_model.SGDClassifier(
+            loss="log_loss",
+            alpha=alpha_value,
+            early_stopping=True,
+            n_iter_no_change=5,
+            tol=1e-3,
+            random_state=42,
+        ).fit(x_train, y_train, sample_weight=sample_weight)
+
+        y_scores = next_model.decision_function(x_eval)
+        curr_score = binary_roc_auc(y_eval, y_scores)
+        if curr_score > best_score:
+            best_score = curr_score
+            best_model = next_model
+            best_alpha = alpha_value
+
+    print(f"Best alpha value: {best_alpha}", flush=True)
+    return best_model
+
+
+def train_log_regression_gpu(
+    x_train: np.ndarray,
+    y_train: np.ndarray,
+    x_eval: np.ndarray,
+    y_eval: np.ndarray,
+    sample_weight: Optional[np.ndarray | None] = None,
+) -> sklearn.base.BaseEstimator:
+    # cuML is an optional dependency, only required for GPU training
+    import cupy
+    import cuml.linear_model
+
+    return cuml.linear_model.LogisticRegression(output_type="numpy").fit(
+        cupy.asarray(x_train, dtype=cupy.float32),
+        cupy.asarray(y_train),
+        sample_weight=None if sample_weight is None else cupy.asarray(sample_weight),
+    )
+
+
 def train_xgboost(
     x_train: np.ndarray,
     y_train: np.ndarray,
@@ -48,23 +111,29 @@ def train_xgboost(
     y_eval: np.ndarray,
     sample_weight: Optional[np.ndarray | None] = None,
 ) -> sklearn.base.BaseEstimator:
-    return xgb.XGBClassifier(
-        objective="binary:logistic",
-        max_depth=1,
-        colsample_bytree=0.5,
-        colsample_bylevel=0.5,
-        colsample_bynode=0.5,
-        reg_lambda=5,
+    # Train through the native API on a quantized matrix rather than the
+    # sklearn wrapper, which re-validates and re-converts its inputs per fit
+    dtrain = xgb.QuantileDMatrix(x_train, label=y_train, weight=sample_weight)
+    deval = xgb.QuantileDMatrix(x_eval, label=y_eval, ref=dtrain)
+    booster = xgb.train(
+        {
+            "objective": "binary:logistic",
+            "tree_method": "hist",
+            "device": get_xgb_device(),
+            "max_depth": 1,
+            "colsample_bytree": 0.5,
+            "colsample_bylevel": 0.5,
+            "colsample_bynode": 0.5,
+            "lambda": 5,
+            "eval_metric": "auc",
+        },
+        dtrain,
+        num_boost_round=100,
+        evals=[(dtrain, "train"), (deval, "eval")],
         early_stopping_rounds=10,
-        n_estimators=100,
-        eval_metric="auc",
-    ).fit(
-        x_train,
-        y_train,
-        eval_set=[(x_train, y_train), (x_eval, y_eval)],
-        sample_weight=sample_weight,
-        verbose=True,
+        verbose_eval=True,
     )
+    return booster_to_classifier(booster)
 
 
 def train_xgboost_reg(
@@ -77,51 +146,210 @@ def train_xgboost_reg(
 ) -> sklearn.base.BaseEstimator:
     lambda_values = [0.1, 1, 5, 10]
     best_score = 0.00
+    device = get_xgb_device()
+
+    # Quantize the training data once and let the eval matrix reuse its bin
+    # cuts, instead of rebuilding both matrices for every lambda value
+    dtrain = xgb.QuantileDMatrix(x_train, label=y_train, weight=sample_weight)
+    deval = xgb.QuantileDMatrix(x_eval, label=y_eval, ref=dtrain)
 
     for lambda_value in lambda_values:
         print(f"Testing lambda value: {lambda_value}", flush=True)
-        next_model = xgb.XGBClassifier(
-            objective="binary:logistic",
-            max_depth=max_depth,
-            colsample_bytree=0.5,
-            colsample_bylevel=0.5,
-            colsample_bynode=0.5,
-            reg_lambda=lambda_value,
+        next_booster = xgb.train(
+            {
+                "objective": "binary:logistic",
+                "tree_method": "hist",
+                "device": device,
+                "max_depth": max_depth,
+                "colsample_bytree": 0.5,
+                "colsample_bylevel": 0.5,
+                "colsample_bynode": 0.5,
+                "lambda": lambda_value,
+                "eval_metric": "auc",
+            },
+            dtrain,
+            num_boost_round=100,
+            evals=[(dtrain, "train"), (deval, "eval")],
             early_stopping_rounds=5,
-            n_estimators=100,
-            eval_metric="auc",
-        ).fit(
-            x_train,
-            y_train,
-            eval_set=[(x_train, y_train), (x_eval, y_eval)],
-            sample_weight=sample_weight,
-            verbose=True,
+            verbose_eval=True,
         )
 
-        curr_score = next_model.best_score
+        curr_score = next_booster.best_score
         if curr_score > best_score:
             best_score = curr_score
-            best_model = next_model
+            best_booster = next_booster
             best_lambda = lambda_value
 
     print(f"Best lambda value: {best_lambda}", flush=True)
+    return booster_to_classifier(best_booster)
+
+
+def train_multinomial(
+    x_train: np.ndarray,
+    y_train: np.ndarray,
+    x_eval: np.ndarray,
+    y_eval: np.ndarray,
+    sample_weight: Optional[np.ndarray | None] = None,
+    c_values: Iterable[float] = (0.01, 0.1, 1, 10),
+) -> sklearn.base.BaseEstimator:
+    best_score = -np.inf
+    best_c = None
+    model = sklearn.linear_model.LogisticRegression(solver="lbfgs", warm_start=True)
+
+    # Sweep from strongest to weakest regularization so each fit starts from
+    # the previous solution
+    for c_value in sorted(c_values):
+        print(f"Testing C value: {c_value}", flush=True)
+        model.set_params(C=c_value).fit(x_train, y_train, sample_weight=sample_weight)
+
+        y_probs = model.predict_proba(x_eval)
+        # Classes missing from the eval split have no ROC-AUC, so skip them
+        # rather than letting the NaN spoil the mean
+        curr_score = np.nanmean(per_label_roc_auc(y_eval, y_probs))
+        if best_c is None or curr_score > best_score:
+            best_score = curr_score
+            best_model = copy.deepcopy(model)
+            best_c = c_value
+
+    print(f"Best C value: {best_c}", flush=True)
     return best_model
 
 
+def per_label_roc_auc(y_true: np.ndarray, y_probs: np.ndarray) -> np.ndarray:
+    return np.array(
+        [
+            binary_roc_auc(y_true == curr_label, y_probs[:, curr_label])
+            for curr_label in range(y_probs.shape[1])
+        ]
+    )
+
+
 def compute_metrics(
-    classifiers: List[sklearn.base.BaseEstimator],
-    x_test: np.ndarray,
+    y_pred: np.ndarray,
     y_test: np.ndarray,
     label_encoder: sklearn.preprocessing.LabelEncoder,
 ) -> Tuple[Iterable[str], Iterable[str]]:
-    predict_probas = np.empty((len(y_test), len(np.unique(y_test))))
-    for i, classifier in enumerate(classifiers):
-        predict_probas[:, i] = classifier.predict_proba(x_test)[:, 1].flatten()
-
-    y_pred = np.argmax(predict_probas, axis=1).flatten()
     return (
-        label_encoder.inverse_transform(y_test),
-        label_encoder.inverse_transform(y_pred),
+        label_encoder.classes_[y_test],
+        label_encoder.classes_[y_pred],
+    )
+
+
+def predict_ovr(
+    classifiers: List[sklearn.base.BaseEstimator] | Dict[str, Any],
+    x_test: np.ndarray,
+    chunk_size: int = 65536,
+) -> np.ndarray:
+    # Accept the model dict ovr_select saves as well as a bare classifier list
+    if isinstance(classifiers, dict):
+        if classifiers["mode"] == "multinomial":
+            (classifier,) = classifiers["classifiers"]
+            return np.argmax(classifier.predict_proba(x_test), axis=1)
+
+        classifiers = classifiers["classifiers"]
+
+    y_pred = np.empty(len(x_test), dtype=np.intp)
+    is_linear = all(hasattr(classifier, "coef_") for classifier in classifiers)
+    if is_linear:
+        weights = np.vstack([classifier.coef_ for classifier in classifiers])
+        intercepts = np.concatenate(
+            [classifier.intercept_ for classifier in classifiers]
+        )
+
+    # Score in row blocks so the (rows, K) score matrix stays small
+    for start in range(0, len(x_test), chunk_size):
+        x_chunk = x_test[start : start + chunk_size]
+        if is_linear:
+            # Sigmoid is monotonic, so the argmax over the stacked logits
+            # matches the argmax over the per-classifier probabilities
+            chunk_scores = x_chunk @ weights.T + intercepts
+        else:
+            chunk_scores = np.empty((len(x_chunk), len(classifiers)), order="F")
+            for i, classifier in enumerate(classifiers):
+                chunk_scores[:, i] = classifier.predict_proba(x_chunk)[:, 1]
+
+        y_pred[start : start + chunk_size] = np.argmax(chunk_scores, axis=1)
+
+    return y_pred
+
+
+def _positive_scores(
+    classifier: sklearn.base.BaseEstimator, x: np.ndarray
+) -> Tuple[np.ndarray, float]:
+    # ROC-AUC is invariant to the sigmoid, so use the raw decision function
+    # where available and skip the per-element exp
+    if hasattr(classifier, "decision_function"):
+        return classifier.decision_function(x), 0.0
+
+    return classifier.predict_proba(x)[:, 1], 0.5
+
+
+def fit_binary_classifier(
+    train_fun: TrainFun,
+    curr_label: int,
+    n_labels: int,
+    x_train: np.ndarray,
+    y_train: np.ndarray,
+    x_eval: np.ndarray,
+    y_eval: np.ndarray,
+    n_threads: int = 1,
+    verbose_train_auc: bool = False,
+) -> Tuple[sklearn.base.BaseEstimator, np.ndarray, float, float]:
+    # Shared by the OvR and OvWT workers: y_train/y_eval are the 0/1 targets
+    # of one label's binary problem. Each worker fits one classifier, so cap
+    # BLAS/OpenMP at this worker's share of the cores to avoid oversubscribing
+    # them across the pool.
+    with threadpoolctl.threadpool_limits(limits=n_threads):
+        print(f"Training classifier {curr_label + 1} of {n_labels}", flush=True)
+
+        # Equivalent to compute_sample_weight("balanced", y_train)
+        n_train = len(y_train)
+        n_positive = np.count_nonzero(y_train)
+        weights = np.where(
+            y_train,
+            n_train / (2 * n_positive),
+            n_train / (2 * (n_train - n_positive)),
+        )
+        classifier = train_fun(x_train, y_train, x_eval, y_eval, weights)
+
+        y_scores, threshold = _positive_scores(classifier, x_eval)
+        roc_auc = binary_roc_auc(y_eval, y_scores)
+        accuracy = np.mean((y_scores > threshold) == y_eval)
+        print(f"Label {curr_label} ROC-AUC: {roc_auc}", flush=True)
+
+        # Scoring the train set is a full extra inference pass, so only do it
+        # on request
+        if verbose_train_auc:
+            y_scores_train, _ = _positive_scores(classifier, x_train)
+            train_roc_auc = binary_roc_auc(y_train, y_scores_train)
+            print(f"Label {curr_label} ROC-AUC (Train): {train_roc_auc}", flush=True)
+
+        print("", flush=True)
+
+    return classifier, y_scores, roc_auc, accuracy
+
+
+def _fit_one(
+    train_fun: TrainFun,
+    curr_label: int,
+    n_labels: int,
+    x_train: np.ndarray,
+    y_train: np.ndarray,
+    x_eval: np.ndarray,
+    y_eval: np.ndarray,
+    n_threads: int = 1,
+    verbose_train_auc: bool = False,
+) -> Tuple[sklearn.base.BaseEstimator, np.ndarray, float, float]:
+    return fit_binary_classifier(
+        train_fun,
+        curr_label,
+        n_labels,
+        x_train,
+        np.equal(y_train, curr_label).view(np.int8),
+        x_eval,
+        np.equal(y_eval, curr_label).view(np.int8),
+        n_threads,
+        verbose_train_auc,
     )
 
 
@@ -131,38 +359,74 @@ def train_ovr_model(
     y_train: np.ndarray,
     x_eval: np.ndarray,
     y_eval: np.ndarray,
-) -> Tuple[List[sklearn.base.BaseEstimator], np.ndarray, np.ndarray]:
+    n_jobs: int = -1,
+    verbose_train_auc: bool = False,
+) -> Tuple[List[sklearn.base.BaseEstimator], np.ndarray, np.ndarray, np.ndarray]:
     unique_labels = np.unique(y_train)
-    classifiers = []
+    classifiers = [None] * len(unique_labels)
+    y_pred = np.zeros(len(y_eval), dtype=np.intp)
+    max_scores = np.full(len(y_eval), -np.inf)
     roc_auc = np.empty_like(unique_labels, dtype=float)
     accuracy = np.empty_like(unique_labels, dtype=float)
 
-    for curr_label in np.unique(y_train):
-        print(
-            f"Training classifier {curr_label + 1} of {unique_labels.max() + 1}",
-            flush=True,
+    n_threads = get_worker_threads(n_jobs, len(unique_labels))
+    results = joblib.Parallel(
+        n_jobs=n_jobs, backend="loky", return_as="generator", verbose=10
+    )(
+        joblib.delayed(_fit_one)(
+            train_fun,
+            curr_label,
+            len(unique_labels),
+            x_train,
+            y_train,
+            x_eval,
+            y_eval,
+            n_threads,
+            verbose_train_auc,
         )
+        for curr_label in unique_labels
+    )
 
-        curr_y_train = np.zeros_like(y_train, dtype=int)
-        curr_y_train[y_train == curr_label] = 1
-        curr_y_eval = np.zeros_like(y_eval, dtype=int)
-        curr_y_eval[y_eval == curr_label] = 1
-        weights = sklearn.utils.compute_sample_weight("balanced", curr_y_train)
-        next_classifier = train_fun(x_train, curr_y_train, x_eval, curr_y_eval, weights)
-
-        y_probs = next_classifier.predict_proba(x_eval)[:, 1].flatten()
-        y_pred = next_classifier.predict(x_eval)
-        roc_auc[curr_label] = sklearn.metrics.roc_auc_score(curr_y_eval, y_probs)
-        accuracy[curr_label] = sklearn.metrics.accuracy_score(curr_y_eval, y_pred)
-        y_probs_train = next_classifier.predict_proba(x_train)[:, 1].flatten()
-        train_roc_auc = sklearn.metrics.roc_auc_score(curr_y_train, y_probs_train)
-        classifiers.append(next_classifier)
-
-        print(f"Label {curr_label} ROC-AUC: {roc_auc[curr_label]}", flush=True)
-        print(f"Label {curr_label} ROC-AUC (Train): {train_roc_auc}", flush=True)
-        print("", flush=True)
+    # Encoded labels are 0..K-1 and results arrive in submission order
+    for curr_label, (classifier, y_scores, curr_roc_auc, curr_accuracy) in enumerate(
+        results
+    ):
+        classifiers[curr_label] = classifier
+        roc_auc[curr_label] = curr_roc_auc
+        accuracy[curr_label] = curr_accuracy
+
+        # Keep a running argmax over classifiers instead of storing every
+        # classifier's eval scores
+        y_pred[y_scores > max_scores] = curr_label
+        np.maximum(y_scores, max_scores, out=max_scores)
+
+    return classifiers, y_pred, roc_auc, accuracy
+
+
+def train_multinomial_model(
+    train_fun: TrainFun,
+    x_train: np.ndarray,
+    y_train: np.ndarray,
+    x_eval: np.ndarray,
+    y_eval: np.ndarray,
+) -> Tuple[sklearn.base.BaseEstimator, np.ndarray, np.ndarray, np.ndarray]:
+    weights = sklearn.utils.compute_sample_weight("balanced", y_train)
+    classifier = train_fun(x_train, y_train, x_eval, y_eval, weights)
+
+    y_probs = classifier.predict_proba(x_eval)
+    y_pred = np.argmax(y_probs, axis=1)
+    roc_auc = per_label_roc_auc(y_eval, y_probs)
+    accuracy = np.array(
+        [
+            np.mean((y_eval == curr_label) == (y_pred == curr_label))
+            for curr_label in range(y_probs.shape[1])
+        ]
+    )
+
+    for curr_label, curr_roc_auc in enumerate(roc_auc):
+        print(f"Label {curr_label} ROC-AUC: {curr_roc_auc}", flush=True)
 
-    return classifiers, roc_auc, accuracy
+    return classifier, y_pred, roc_auc, accuracy
 
 
 def ovr_select(
@@ -172,47 +436,59 @@ def ovr_select(
     features_path: os.PathLike,
     output_path: os.PathLike,
     select_key: str,
+    n_jobs: int = -1,
+    multinomial: bool = False,
+    verbose_train_auc: bool = False,
 ) -> float:
     output_path = pathlib.Path(output_path)
-    train_df = pd.read_csv(train_df_path)
-    eval_df = pd.read_csv(eval_df_path)
-    features = np.load(features_path)
-
-    x_train = features[train_df["index"]]
-    x_eval = features[eval_df["index"]]
-
-    labels = train_df[select_key]
-    label_encoder = sklearn.preprocessing.LabelEncoder()
-    label_encoder.fit(labels)
-    y_train = label_encoder.transform(train_df[select_key])
-    y_eval = label_encoder.transform(eval_df[select_key])
-
-    classifiers, roc_auc, accuracy = train_ovr_model(
-        train_fun,
-        x_train,
-        y_train,
-        x_eval,
-        y_eval,
+    label_encoder, train_labels, (x_train, x_eval), (y_train, y_eval) = load_splits(
+        features_path, select_key, train_df_path, eval_df_path
     )
 
+    if multinomial:
+        classifiers, y_pred, roc_auc, accuracy = train_multinomial_model(
+            train_fun,
+            x_train,
+            y_train,
+            x_eval,
+            y_eval,
+        )
+    else:
+        classifiers, y_pred, roc_auc, accuracy = train_ovr_model(
+            train_fun,
+            x_train,
+            y_train,
+            x_eval,
+            y_eval,
+            n_jobs=n_jobs,
+            verbose_train_auc=verbose_train_auc,
+        )
+
+    # Store the label encoder and the expected feature layout with the model so
+    # it can be used for inference without refitting the encoder
     with open(output_path / "ovr_model.pkl", "wb") as f:
-        pickle.dump(classifiers, f)
+        pickle.dump(
+            {
+                "mode": "multinomial" if multinomial else "ovr",
+                # Always a list, holding the single model in multinomial mode
+                "classifiers": [classifiers] if multinomial else classifiers,
+                "label_encoder": label_encoder,
+                "feature_order": "C",
+                "dtype": "float32",
+            },
+            f,
+        )
 
-    auc_roc_series = pd.Series(
-        roc_auc,
-        index=label_encoder.inverse_transform(np.unique(y_eval)),
-    )
-
-    accuracy_series = pd.Series(
-        accuracy,
-        index=label_encoder.inverse_transform(np.unique(y_eval)),
-    )
+    # Encoded labels are 0..K-1, so the classes index the metrics directly
+    idx_to_label = label_encoder.classes_
+    auc_roc_series = pd.Series(roc_auc, index=idx_to_label)
+    accuracy_series = pd.Series(accuracy, index=idx_to_label)
 
     # Compute and save metrics
-    label_true, label_pred = compute_metrics(classifiers, x_eval, y_eval, label_encoder)
+    label_true, label_pred = compute_metrics(y_pred, y_eval, label_encoder)
 
     save_metrics(
-        train_df,
+        train_labels,
         auc_roc_series,
         accuracy_series,
         select_key,
@@ -224,6 +500,27 @@ def ovr_select(
     return roc_auc.mean()
 
 
+def ovr_predict(
+    model_path: os.PathLike,
+    split_path: os.PathLike,
+    features_path: os.PathLike,
+    output_path: os.PathLike,
+) -> None:
+    with open(model_path, "rb") as f:
+        model = pickle.load(f)
+
+    split_df = pd.read_csv(split_path, usecols=["index"], dtype={"index": np.intp})
+    (x_test,) = load_features(features_path, split_df["index"])
+    y_pred = predict_ovr(model, x_test)
+
+    pd.DataFrame(
+        {
+            "index": split_df["index"],
+            "label_predicted": model["label_encoder"].classes_[y_pred],
+        }
+    ).to_csv(pathlib.Path(output_path) / "ovr_predictions.csv", index=False)
+
+
 def ovr_hyperparam_search(
     train_fun: TrainFun,
     param_grid: Dict[str, List[Any]],
@@ -233,9 +530,10 @@ def ovr_hyperparam_search(
     output_path: os.PathLike,
     select_key: str,
     class_sample: int = 10,
+    n_jobs: int = -1,
 ) -> Dict[str, Any]:
-    train_df = pd.read_csv(train_df_path)
-    eval_df = pd.read_csv(eval_df_path)
+    train_df = read_split(train_df_path, select_key)
+    eval_df = read_split(eval_df_path, select_key)
     output_path = pathlib.Path(output_path)
     unique_values = train_df[select_key].unique()
     selected_classes = random.sample(list(unique_values), class_sample)
@@ -264,6 +562,7 @@ def ovr_hyperparam_search(
             features_path,
             next_output_path,
             select_key,
+            n_jobs=n_jobs,
         )
 
         if mean_auc_roc > best_auc_roc:
@@ -280,17 +579,33 @@ def ovr_select_log() -> Callable:
     return functools.partial(ovr_select, train_log_regression)
 
 
+def ovr_select_log_sgd() -> Callable:
+    return functools.partial(ovr_select, train_log_regression_sgd)
+
+
+def ovr_select_log_gpu() -> Callable:
+    # Fit sequentially so the worker processes do not contend for the GPU
+    return functools.partial(ovr_select, train_log_regression_gpu, n_jobs=1)
+
+
+def ovr_select_multinomial() -> Callable:
+    return functools.partial(ovr_select, train_multinomial, multinomial=True)
+
+
 def ovr_select_xgboost() -> Callable:
-    return functools.partial(ovr_select, train_xgboost)
+    return functools.partial(ovr_select, train_xgboost, n_jobs=get_xgb_n_jobs())
 
 
 def ovr_select_xgboost_reg() -> Callable:
-    return functools.partial(ovr_select, train_xgboost_reg)
+    return functools.partial(ovr_select, train_xgboost_reg, n_jobs=get_xgb_n_jobs())
 
 
 def ovr_xgb_search_height() -> Callable:
     return functools.partial(
-        ovr_hyperparam_search, train_xgboost_reg, {"max_depth": [1, 3, 6, 9]}
+        ovr_hyperparam_search,
+        train_xgboost_reg,
+        {"max_depth": [1, 3, 6, 9]},
+        n_jobs=get_xgb_n_jobs(),
     )
 
 
@@ -298,8 +613,12 @@ if __name__ == "__main__":
     fire.Fire(
         {
             "ovr_log_select": ovr_select_log(),
+            "ovr_log_sgd_select": ovr_select_log_sgd(),
+            "ovr_log_select_gpu": ovr_select_log_gpu(),
+            "ovr_multinomial_select": ovr_select_multinomial(),
             "ovr_xgb_select": ovr_select_xgboost(),
             "ovr_xgb_reg_select": ovr_select_xgboost_reg(),
             "ovr_xgb_hparams": ovr_xgb_search_height(),
+            "ovr_predict": ovr_predict,
         }
     )
@@ -5,6 +5,7 @@ import pickle
 from typing import List, Tuple, Callable
 
 import fire
+import joblib
 import numpy as np
 import pandas as pd
 import sklearn
@@ -16,8 +17,70 @@ import sklearn.multiclass
 import sklearn.preprocessing
 import sklearn.utils
 
-from .ovr_select import TrainFun, compute_metrics, train_xgboost_reg
-from .utils import save_metrics_no_prediction
+from .ovr_select import (
+    TrainFun,
+    compute_metrics,
+    fit_binary_classifier,
+    train_xgboost_reg,
+)
+from .utils import (
+    get_worker_threads,
+    get_xgb_n_jobs,
+    load_splits,
+    save_metrics_no_prediction,
+)
+
+
+def _label_indices(labels: np.ndarray, n_labels: int) -> List[np.ndarray]:
+    # One stable sort groups the row positions of every label, replacing a full
+    # boolean mask scan per label
+    label_order = np.argsort(labels, kind="stable")
+    label_counts = np.bincount(labels, minlength=n_labels)
+    return np.split(label_order, np.cumsum(label_counts)[:-1])
+
+
+def _stack_variant(
+    wt_features: np.ndarray, features: np.ndarray, variant_indices: np.ndarray
+) -> np.ndarray:
+    n_wt = len(wt_features)
+    combined = np.empty(
+        (n_wt + len(variant_indices), features.shape[1]), dtype=features.dtype
+    )
+    combined[:n_wt] = wt_features
+    np.take(features, variant_indices, axis=0, out=combined[n_wt:])
+    return combined
+
+
+def _variant_labels(n_wt: int, n_variant: int) -> np.ndarray:
+    # WT rows come first in the stacked features, followed by the variant rows
+    return np.repeat(np.array([0, 1], dtype=np.int8), [n_wt, n_variant])
+
+
+def _fit_variant(
+    train_fun: TrainFun,
+    curr_label: int,
+    n_labels: int,
+    wt_x_train: np.ndarray,
+    x_train: np.ndarray,
+    train_indices: np.ndarray,
+    wt_x_eval: np.ndarray,
+    x_eval: np.ndarray,
+    eval_indices: np.ndarray,
+    n_threads: int = 1,
+    verbose_train_auc: bool = False,
+) -> Tuple[sklearn.base.BaseEstimator, float, float]:
+    classifier, _, roc_auc, accuracy = fit_binary_classifier(
+        train_fun,
+        curr_label,
+        n_labels,
+        _stack_variant(wt_x_train, x_train, train_indices),
+        _variant_labels(len(wt_x_train), len(train_indices)),
+        _stack_variant(wt_x_eval, x_eval, eval_indices),
+        _variant_labels(len(wt_x_eval), len(eval_indices)),
+        n_threads,
+        verbose_train_auc,
+    )
+    return classifier, roc_auc, accuracy
 
 
 def train_ovwt_model(
@@ -27,51 +90,51 @@ def train_ovwt_model(
     x_eval: np.ndarray,
     y_eval: np.ndarray,
     wt_label: int,
+    n_jobs: int = -1,
+    verbose_train_auc: bool = False,
 ) -> Tuple[List[sklearn.base.BaseEstimator], np.ndarray, np.ndarray]:
+    # Label set is computed once and reused for every per-variant lookup
     unique_labels = np.unique(y_train)
+    n_labels = len(unique_labels)
     classifiers = []
-    roc_auc = np.empty_like(unique_labels, dtype=float)
-    accuracy = np.empty_like(unique_labels, dtype=float)
-
-    for curr_label in np.unique(y_train):
-        if curr_label == wt_label:
-            print("Wild Type Label, Skipping", flush=True)
-            print("", flush=True)
-            roc_auc[curr_label] = np.nan
-            accuracy[curr_label] = np.nan
-
-            continue
-
-        print(
-            f"Training classifier {curr_label + 1} of {unique_labels.max() + 1}",
-            flush=True,
-        )
-
-        x_train_filtered = x_train[(y_train == curr_label) | (y_train == wt_label)]
-        y_train_filtered = y_train[(y_train == curr_label) | (y_train == wt_label)]
-        x_eval_filtered = x_eval[(y_eval == curr_label) | (y_eval == wt_label)]
-        y_eval_filtered = y_eval[(y_eval == curr_label) | (y_eval == wt_label)]
-
-        curr_y_train = np.zeros_like(y_train_filtered, dtype=int)
-        curr_y_train[y_train_filtered == curr_label] = 1
-        curr_y_eval = np.zeros_like(y_eval_filtered, dtype=int)
-        curr_y_eval[y_eval_filtered == curr_label] = 1
-        weights = sklearn.utils.compute_sample_weight("balanced", curr_y_train)
-        next_classifier = train_fun(
-            x_train_filtered, curr_y_train, x_eval_filtered, curr_y_eval, weights
+    roc_auc = np.full_like(unique_labels, np.nan, dtype=float)
+    accuracy = np.full_like(unique_labels, np.nan, dtype=float)
+
+    # Every variant model shares the WT rows, so gather them once and hand the
+    # same block to every worker
+    train_indices = _label_indices(y_train, n_labels)
+    eval_indices = _label_indices(y_eval, n_labels)
+    wt_x_train = np.take(x_train, train_indices[wt_label], axis=0)
+    wt_x_eval = np.take(x_eval, eval_indices[wt_label], axis=0)
+    variant_labels = unique_labels[unique_labels != wt_label]
+
+    print("Wild Type Label, Skipping", flush=True)
+    print("", flush=True)
+
+    n_threads = get_worker_threads(n_jobs, len(variant_labels))
+    results = joblib.Parallel(n_jobs=n_jobs, backend="loky", verbose=10)(
+        joblib.delayed(_fit_variant)(
+            train_fun,
+            curr_label,
+            n_labels,
+            wt_x_train,
+            x_train,
+            train_indices[curr_label],
+            wt_x_eval,
+            x_eval,
+            eval_indices[curr_label],
+            n_threads,
+            verbose_train_auc,
         )
+        for curr_label in variant_labels
+    )
 
-        y_probs = next_classifier.predict_proba(x_eval_filtered)[:, 1].flatten()
-        y_pred = next_classifier.predict(x_eval_filtered)
-        roc_auc[curr_label] = sklearn.metrics.roc_auc_score(curr_y_eval, y_probs)
-        accuracy[curr_label] = sklearn.metrics.accuracy_score(curr_y_eval, y_pred)
-        y_probs_train = next_classifier.predict_proba(x_train_filtered)[:, 1].flatten()
-        train_roc_auc = sklearn.metrics.roc_auc_score(curr_y_train, y_probs_train)
-        classifiers.append(next_classifier)
-
-        print(f"Label {curr_label} ROC-AUC: {roc_auc[curr_label]}", flush=True)
-        print(f"Label {curr_label} ROC-AUC (Train): {train_roc_auc}", flush=True)
-        print("", flush=True)
+    for curr_label, (classifier, curr_roc_auc, curr_accuracy) in zip(
+        variant_labels, results
+    ):
+        classifiers.append(classifier)
+        roc_auc[curr_label] = curr_roc_auc
+        accuracy[curr_label] = curr_accuracy
 
     return classifiers, roc_auc, accuracy
 
@@ -84,20 +147,13 @@ def ovwt_select(
     output_path: os.PathLike,
     select_key: str = "aaChanges",
     wt_value: str = "WT",
+    n_jobs: int = -1,
+    verbose_train_auc: bool = False,
 ) -> float:
     output_path = pathlib.Path(output_path)
-    train_df = pd.read_csv(train_df_path)
-    eval_df = pd.read_csv(eval_df_path)
-    features = np.load(features_path)
-
-    x_train = features[train_df["index"]]
-    x_eval = features[eval_df["index"]]
-
-    labels = train_df[select_key]
-    label_encoder = sklearn.preprocessing.LabelEncoder()
-    label_encoder.fit(labels)
-    y_train = label_encoder.transform(train_df[select_key])
-    y_eval = label_encoder.transform(eval_df[select_key])
+    label_encoder, train_labels, (x_train, x_eval), (y_train, y_eval) = load_splits(
+        features_path, select_key, train_df_path, eval_df_path
+    )
     wt_label = label_encoder.transform([wt_value])[0]
 
     classifiers, roc_auc, accuracy = train_ovwt_model(
@@ -107,23 +163,19 @@ def ovwt_select(
         x_eval,
         y_eval,
         wt_label,
+        n_jobs=n_jobs,
+        verbose_train_auc=verbose_train_auc,
     )
 
     with open(output_path / "ovwt_model.pkl", "wb") as f:
         pickle.dump(classifiers, f)
 
-    auc_roc_series = pd.Series(
-        roc_auc,
-        index=label_encoder.inverse_transform(np.unique(y_eval)),
-    )
-    accuracy_series = pd.Series(
-        accuracy,
-        index=label_encoder.inverse_transform(np.unique(y_eval)),
-    )
+    auc_roc_series = pd.Series(roc_auc, index=label_encoder.classes_)
+    accuracy_series = pd.Series(accuracy, index=label_encoder.classes_)
 
     # Save Metrics
     save_metrics_no_prediction(
-        train_df,
+        train_labels,
         auc_roc_series,
         accuracy_series,
         select_key,
@@ -134,7 +186,7 @@ def ovwt_select(
 
 
 def ovwt_select_xgboost_reg() -> Callable:
-    return functools.partial(ovwt_select, train_xgboost_reg)
+    return functools.partial(ovwt_select, train_xgboost_reg, n_jobs=get_xgb_n_jobs())
 
 
 if __name__ == "__main__":
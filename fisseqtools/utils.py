@@ -3,11 +3,165 @@ import pathlib
 from typing import Iterable, Optional, Tuple
 
 import fire
+import joblib
 import numpy as np
 import pandas as pd
+import scipy.stats
 import sklearn.decomposition
 import sklearn.model_selection
 import sklearn.preprocessing
+import xgboost as xgb
+
+
+def binary_roc_auc(y_true: np.ndarray, y_score: np.ndarray) -> float:
+    # Mann-Whitney form of the ROC-AUC, with tied scores sharing their average
+    # rank, which skips roc_auc_score's input validation and curve building
+    y_true = np.asarray(y_true, dtype=bool)
+    n_pos = np.count_nonzero(y_true)
+    n_neg = len(y_true) - n_pos
+    ranks = scipy.stats.rankdata(y_score)
+    return (ranks[y_true].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+
+
+def get_xgb_device() -> str:
+    # Train on the GPU only when XGBoost was built with CUDA and a device is
+    # visible, otherwise XGBoost warns and falls back to the CPU on every fit
+    if not xgb.build_info().get("USE_CUDA"):
+        return "cpu"
+
+    try:
+        import cupy
+
+        return "cuda" if cupy.cuda.runtime.getDeviceCount() > 0 else "cpu"
+    except Exception:
+        return "cpu"
+
+
+def booster_to_classifier(booster: xgb.Booster) -> xgb.XGBClassifier:
+    # Wrap a natively trained booster so callers keep the sklearn interface
+    classifier = xgb.XGBClassifier()
+    classifier.load_model(bytearray(booster.save_raw(raw_format="ubj")))
+    return classifier
+
+
+def get_worker_threads(n_jobs: int, n_tasks: int) -> int:
+    # Split the cores between the concurrently running workers, so a pool with
+    # fewer workers than cores still gives each fit several BLAS/OpenMP threads
+    n_workers = max(1, min(joblib.effective_n_jobs(n_jobs), n_tasks))
+    return max(1, joblib.cpu_count() // n_workers)
+
+
+def get_xgb_n_jobs() -> int:
+    # Every worker process would open its own CUDA context on the same device,
+    # so fit the XGBoost models one at a time when training on the GPU
+    return 1 if get_xgb_device() == "cuda" else -1
+
+
+def encode_labels(
+    label_encoder: sklearn.preprocessing.LabelEncoder, labels: Iterable[str]
+) -> np.ndarray:
+    # Hash lookup against the fitted classes, in place of the searchsorted
+    # LabelEncoder.transform does over the sorted classes
+    encoded = pd.Index(label_encoder.classes_).get_indexer(labels)
+    if (encoded < 0).any():
+        raise ValueError("labels contain previously unseen values")
+
+    return encoded
+
+
+def encode_splits(
+    select_key: str, train_df: pd.DataFrame, *other_dfs: pd.DataFrame
+) -> Tuple[sklearn.preprocessing.LabelEncoder, np.ndarray, ...]:
+    # Fit the encoder on the train labels and encode every split with it. The
+    # native XGBoost API does no label validation of its own, so this is where
+    # labels are checked: encode_labels raises a ValueError for any eval/test
+    # label outside the train classes, leaving only codes in 0..K-1.
+    label_encoder = sklearn.preprocessing.LabelEncoder().fit(train_df[select_key])
+    return (label_encoder,) + tuple(
+        encode_labels(label_encoder, curr_df[select_key])
+        for curr_df in (train_df, *other_dfs)
+    )
+
+
+def read_split(split_path: os.PathLike, select_key: str) -> pd.DataFrame:
+    # Only the feature row index and the label column are used downstream. The
+    # index is parsed as intp, the dtype numpy gathers with, so load_features
+    # can use it without a conversion copy. The label column is parsed with its
+    # natural dtype before it becomes categorical, so numeric labels keep their
+    # numeric type and ordering.
+    split_df = pd.read_csv(
+        split_path, usecols=["index", select_key], dtype={"index": np.intp}
+    )
+    split_df[select_key] = split_df[select_key].astype("category")
+    return split_df
+
+
+def load_features(
+    features_path: os.PathLike, *row_indices: Iterable[int]
+) -> Tuple[np.ndarray, ...]:
+    # Memory map the feature matrix so only the requested rows are read, and
+    # gather each subset into its own C-contiguous float32 array. Quantized
+    # features from quantize_features, recognized by their .scale.npy sidecar,
+    # are dequantized after the gather.
+    features = np.load(features_path, mmap_mode="r")
+    scale_path = _scale_path(features_path)
+    scale = np.load(scale_path) if scale_path.exists() else None
+
+    feature_subsets = []
+    for curr_indices in row_indices:
+        curr_features = np.ascontiguousarray(
+            features[np.asarray(curr_indices, dtype=np.intp)], dtype=np.float32
+        )
+        if scale is not None:
+            curr_features *= scale
+
+        feature_subsets.append(curr_features)
+
+    return tuple(feature_subsets)
+
+
+def load_splits(
+    features_path: os.PathLike, select_key: str, *split_paths: os.PathLike
+) -> Tuple[
+    sklearn.preprocessing.LabelEncoder,
+    pd.DataFrame,
+    Tuple[np.ndarray, ...],
+    Tuple[np.ndarray, ...],
+]:
+    # Read the splits, gather their feature rows and encode their labels with
+    # an encoder fit on the first (train) split. Only the train label column
+    # is returned, so the split frames are freed before any model is trained.
+    split_dfs = [read_split(split_path, select_key) for split_path in split_paths]
+    features = load_features(
+        features_path, *(split_df["index"] for split_df in split_dfs)
+    )
+    label_encoder, *labels = encode_splits(select_key, *split_dfs)
+    return label_encoder, split_dfs[0][[select_key]], features, tuple(labels)
+
+
+def _scale_path(quantized_path: os.PathLike) -> pathlib.Path:
+    return pathlib.Path(quantized_path).with_suffix(".scale.npy")
+
+
+def quantize_features(
+    features_path: os.PathLike, quantized_path: os.PathLike, chunk_size: int = 65536
+) -> None:
+    # The int8 matrix is written as a plain .npy so load_features can memory map
+    # it, with the per-feature scale saved alongside as <name>.scale.npy
+    features = np.load(features_path, mmap_mode="r")
+    scale = np.max(np.abs(features), axis=0).astype(np.float32) / 127
+    scale[scale == 0] = 1.0
+    np.save(_scale_path(quantized_path), scale)
+
+    features_q = np.lib.format.open_memmap(
+        quantized_path, mode="w+", dtype=np.int8, shape=features.shape
+    )
+    for start in range(0, len(features), chunk_size):
+        features_q[start : start + chunk_size] = np.round(
+            features[start : start + chunk_size] / scale
+        )
+
+    features_q.flush()
 
 
 def filter_labels(
@@ -16,14 +170,29 @@ def filter_labels(
     frequency_cutoff: int,
     random_state: Optional[int] = 42,
 ) -> pd.DataFrame:
-    label_counts = data[label_col].value_counts()
-    freq_mask = data[label_col].map(label_counts) >= frequency_cutoff
-    selected_rows = data[freq_mask]
-    selected_rows = selected_rows.groupby(label_col, group_keys=False).apply(
-        lambda x: x.sample(n=frequency_cutoff, random_state=random_state)
+    # Group the row positions of each label with one stable sort, then draw
+    # frequency_cutoff rows from every label that has enough of them. Missing
+    # labels get code -1 and are dropped, as value_counts/groupby did.
+    label_codes, _ = pd.factorize(data[label_col], sort=True)
+    labeled_rows = np.flatnonzero(label_codes >= 0)
+    label_codes = label_codes[labeled_rows]
+    label_counts = np.bincount(label_codes)
+    label_rows = np.split(
+        labeled_rows[np.argsort(label_codes, kind="stable")],
+        np.cumsum(label_counts)[:-1],
     )
 
-    return selected_rows
+    rng = np.random.default_rng(random_state)
+    selected_rows = [
+        rng.choice(curr_rows, size=frequency_cutoff, replace=False)
+        for curr_rows in label_rows
+        if len(curr_rows) >= frequency_cutoff
+    ]
+
+    if not selected_rows:
+        return data.iloc[:0]
+
+    return data.iloc[np.concatenate(selected_rows)]
 
 
 def split_data(
@@ -105,7 +274,6 @@ def save_metrics_no_prediction(
     metrics_df["auc_roc"] = metrics_df["label"].map(auc_roc_series)
     metrics_df["accuracy"] = metrics_df["label"].map(accuracy_series)
     metrics_df.to_csv(output_path / "metrics.csv", index=False)
-    metrics_df = metrics_df.sort_values(by="auc_roc", ascending=False)
 
 
 def save_metrics(
@@ -126,4 +294,6 @@ def save_metrics(
 
 
 if __name__ == "__main__":
-    fire.Fire({"splits": generate_splits, "pca": get_pca})
+    fire.Fire(
+        {"splits": generate_splits, "pca": get_pca, "quantize": quantize_features}
+    )
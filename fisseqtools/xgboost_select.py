@@ -2,11 +2,13 @@ import json
 import os
 import pathlib
 import pickle
-from typing import Iterable, Optional, Tuple
+from typing import Any, Dict, Iterable, Optional, Tuple
 
 import fire
+import joblib
 import numpy as np
 import pandas as pd
+import scipy.stats
 import sklearn.experimental.enable_halving_search_cv
 import sklearn.metrics
 import sklearn.model_selection
@@ -14,7 +16,12 @@ import sklearn.preprocessing
 import sklearn.utils.class_weight
 import xgboost as xgb
 
-from .utils import save_metrics
+from .utils import (
+    booster_to_classifier,
+    get_xgb_device,
+    load_splits,
+    save_metrics,
+)
 
 
 def compute_metrics(
@@ -23,31 +30,38 @@ def compute_metrics(
     y_test: np.ndarray,
     label_encoder: sklearn.preprocessing.LabelEncoder,
 ) -> Tuple[pd.Series, pd.Series, Iterable[str], Iterable[str]]:
-    y_pred = model.predict(x_test)
+    # One inference pass; the predicted class is the most probable one
     y_prob = model.predict_proba(x_test)
-    y_test_binarized = sklearn.preprocessing.label_binarize(
-        y_test, classes=np.unique(y_test)
-    )
+    y_pred = np.argmax(y_prob, axis=1)
 
+    # Take the class count from the model output and index the encoder classes
+    # directly instead of re-scanning y_test for its unique values
+    n_classes = y_prob.shape[1]
     label_auc_roc = sklearn.metrics.roc_auc_score(
-        y_test_binarized, y_prob, average=None
+        y_test,
+        y_prob,
+        multi_class="ovr",
+        average=None,
+        labels=np.arange(n_classes),
     )
-    n_unique_classes = len(np.unique(y_test))
-    auc_roc_series = pd.Series(
-        label_auc_roc,
-        index=label_encoder.inverse_transform(np.arange(n_unique_classes)),
+    auc_roc_series = pd.Series(label_auc_roc, index=label_encoder.classes_[:n_classes])
+
+    # Per-class accuracy from dense counts over the encoded labels, keeping only
+    # the classes present in the test set
+    totals = np.bincount(y_test, minlength=n_classes)
+    correct = np.bincount(y_test, weights=y_pred == y_test, minlength=n_classes)
+    is_present = totals > 0
+    accuracy_series = pd.Series(
+        correct[is_present] / totals[is_present],
+        index=label_encoder.classes_[is_present],
     )
-
-    is_correct = (y_pred == y_test).astype(int)
-    test_labels = label_encoder.inverse_transform(y_test)
-    accuracy_df = pd.DataFrame({"label": test_labels, "is_correct": is_correct})
-    accuracy_series = accuracy_df.groupby("label")["is_correct"].mean()
+    test_labels = label_encoder.classes_[y_test]
 
     return (
         auc_roc_series,
         accuracy_series,
         test_labels,
-        label_encoder.inverse_transform(y_pred),
+        label_encoder.classes_[y_pred],
     )
 
 
@@ -61,37 +75,41 @@ def xgboost_select(
     learning_rate: Optional[float] = 0.1,
     n_estimators: Optional[int] = 100,
     max_depth: Optional[int] = 3,
+    device: Optional[str] = None,
 ) -> None:
     output_path = pathlib.Path(output_path)
-    train_df = pd.read_csv(train_df_path)
-    eval_df = pd.read_csv(eval_df_path)
-    test_df = pd.read_csv(test_df_path)
-    features = np.load(features_path)
-
-    x_train = features[train_df["index"]]
-    x_eval = features[eval_df["index"]]
-    x_test = features[test_df["index"]]
-
-    labels = train_df[select_key]
-    label_encoder = sklearn.preprocessing.LabelEncoder()
-    label_encoder.fit(labels)
-    y_train = label_encoder.transform(train_df[select_key])
-    y_eval = label_encoder.transform(eval_df[select_key])
-    y_test = label_encoder.transform(test_df[select_key])
-
-    # Train model
-    xgb_clf = xgb.XGBClassifier(
-        eval_metric="mlogloss",
+    device = device or get_xgb_device()
+    (
+        label_encoder,
+        train_labels,
+        (x_train, x_eval, x_test),
+        (y_train, y_eval, y_test),
+    ) = load_splits(
+        features_path, select_key, train_df_path, eval_df_path, test_df_path
+    )
+
+    # Train model through the native API on quantized matrices, with the eval
+    # matrix reusing the training bin cuts
+    dtrain = xgb.QuantileDMatrix(x_train, label=y_train, max_bin=256)
+    deval = xgb.QuantileDMatrix(x_eval, label=y_eval, ref=dtrain)
+    booster = xgb.train(
+        {
+            "objective": "multi:softprob",
+            "num_class": len(label_encoder.classes_),
+            "tree_method": "hist",
+            "device": device,
+            "max_bin": 256,
+            "eval_metric": "mlogloss",
+            "learning_rate": learning_rate,
+            "max_depth": max_depth,
+        },
+        dtrain,
+        num_boost_round=n_estimators,
+        evals=[(deval, "eval")],
         early_stopping_rounds=5,
-        learning_rate=learning_rate,
-        n_estimators=n_estimators,
-        max_depth=max_depth,
-    ).fit(
-        x_train,
-        y_train,
-        eval_set=[(x_eval, y_eval)],
-        verbose=True,
+        verbose_eval=True,
     )
+    xgb_clf = booster_to_classifier(booster)
 
     with open(output_path / "xgboost_model.pkl", "wb") as f:
         pickle.dump(xgb_clf, f)
@@ -101,7 +119,7 @@ def xgboost_select(
         xgb_clf, x_test, y_test, label_encoder
     )
     save_metrics(
-        train_df,
+        train_labels,
         auc_roc_series,
         accuracy_series,
         select_key,
@@ -111,6 +129,42 @@ def xgboost_select(
     )
 
 
+def _fit_params(
+    params: Dict[str, Any],
+    dtrain: xgb.QuantileDMatrix,
+    deval: xgb.QuantileDMatrix,
+    y_eval: np.ndarray,
+    n_classes: int,
+    n_testing_rounds: int,
+    n_threads: int,
+    device: str,
+) -> Tuple[float, Dict[str, Any], xgb.Booster]:
+    booster = xgb.train(
+        {
+            "objective": "multi:softprob",
+            "num_class": n_classes,
+            "tree_method": "hist",
+            "device": device,
+            "max_bin": 256,
+            "eval_metric": "mlogloss",
+            "learning_rate": 0.3,
+            "nthread": n_threads,
+            **params,
+        },
+        dtrain,
+        num_boost_round=n_testing_rounds,
+        evals=[(dtrain, "train"), (deval, "eval")],
+        early_stopping_rounds=2,
+        verbose_eval=False,
+    )
+
+    y_probs = booster.predict(deval, iteration_range=(0, booster.best_iteration + 1))
+    curr_score = np.mean(np.argmax(y_probs, axis=1) == y_eval)
+    # Samples run concurrently, so report each one in a single line once done
+    print(f"Parameters: {params}, accuracy score: {curr_score:.4f}", flush=True)
+    return curr_score, params, booster
+
+
 def search_hyperparams(
     train_df_path: os.PathLike,
     eval_df_path: os.PathLike,
@@ -119,62 +173,65 @@ def search_hyperparams(
     select_key: str,
     n_testing_rounds: Optional[int] = 20,
     search_samples: Optional[int] = 60,
+    n_jobs: int = -1,
+    device: Optional[str] = None,
 ) -> None:
     output_path = pathlib.Path(output_path)
-    train_df = pd.read_csv(train_df_path)
-    eval_df = pd.read_csv(eval_df_path)
-    features = np.load(features_path)
-
-    x_train = features[train_df["index"]]
-    x_eval = features[eval_df["index"]]
-
-    labels = train_df[select_key]
-    label_encoder = sklearn.preprocessing.LabelEncoder()
-    label_encoder.fit(labels)
-    y_train = label_encoder.transform(train_df[select_key])
-    y_eval = label_encoder.transform(eval_df[select_key])
+    device = device or get_xgb_device()
+    label_encoder, _, (x_train, x_eval), (y_train, y_eval) = load_splits(
+        features_path, select_key, train_df_path, eval_df_path
+    )
 
+    # Continuous parameters are drawn from distributions rather than fixed
+    # grids so the sample budget covers the space
     param_dist = {
-        "max_depth": [1, 2],
-        "subsample": [0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
-        "colsample_bytree": [0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
-        "colsample_bylevel": [0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
-        "colsample_bytree": [0.5, 0.6, 0.7, 0.8, 0.9, 1.0],
+        "max_depth": scipy.stats.randint(1, 10),
+        "learning_rate": scipy.stats.loguniform(1e-3, 3e-1),
+        "subsample": scipy.stats.uniform(0.5, 0.5),
+        "colsample_bytree": scipy.stats.uniform(0.5, 0.5),
+        "colsample_bylevel": scipy.stats.uniform(0.5, 0.5),
+        "reg_alpha": scipy.stats.loguniform(1e-3, 1.0),
+        "reg_lambda": scipy.stats.loguniform(1e-3, 1.0),
     }
 
-    best_params = None
-    best_score = -float("inf")
-    best_model = None
-    for params in sklearn.model_selection.ParameterSampler(
-        param_dist, n_iter=search_samples, random_state=42
-    ):
-        print(f"Testing parameters: {params}", flush=True)
-        model = xgb.XGBClassifier(
-            eval_metric="mlogloss",
-            early_stopping_rounds=2,
-            learning_rate=0.3,
-            n_estimators=n_testing_rounds,
-            **params,
-        ).fit(
-            x_train,
-            y_train,
-            eval_set=[(x_train, y_train), (x_eval, y_eval)],
-            verbose=True,
+    # The data is the same for every sampled configuration, so quantize it once
+    dtrain = xgb.QuantileDMatrix(x_train, label=y_train, max_bin=256)
+    deval = xgb.QuantileDMatrix(x_eval, label=y_eval, ref=dtrain)
+
+    # XGBoost releases the GIL while training, so a thread pool can share the
+    # quantized matrices across samples. Split the cores between the outer
+    # jobs and XGBoost's own threads to avoid oversubscription. On the GPU the
+    # samples would all train on, and lazily build device pages of, the same
+    # matrices on one device, so run them one at a time there.
+    n_outer_jobs = 1 if device == "cuda" else joblib.effective_n_jobs(n_jobs)
+    n_threads = max(1, joblib.cpu_count() // n_outer_jobs)
+    results = joblib.Parallel(n_jobs=n_outer_jobs, backend="threading")(
+        joblib.delayed(_fit_params)(
+            params,
+            dtrain,
+            deval,
+            y_eval,
+            len(label_encoder.classes_),
+            n_testing_rounds,
+            n_threads,
+            device,
+        )
+        for params in sklearn.model_selection.ParameterSampler(
+            param_dist, n_iter=search_samples, random_state=42
         )
+    )
 
-        curr_score = model.score(x_eval, y_eval)
-        print(f"Accuracy score: {curr_score:.4f}", flush=True)
-        if curr_score > best_score:
-            best_score = curr_score
-            best_params = params
-            best_model = model
-            print("  New Best!", flush=True)
+    # max keeps the first sample on ties, matching the old serial search
+    best_score, best_params, best_booster = max(results, key=lambda r: r[0])
+    print(f"Best parameters: {best_params}", flush=True)
+    print(f"Best accuracy score: {best_score:.4f}", flush=True)
 
     with open(output_path / "best_xgboost_model.pkl", "wb") as f:
-        pickle.dump(best_model, f)
+        pickle.dump(booster_to_classifier(best_booster), f)
 
     with open(output_path / f"best_xgboost_params_{best_score:.2f}.json", "w") as f:
-        json.dump(best_params, f)
+        # Sampled values are numpy scalars, which json cannot serialize
+        json.dump(best_params, f, default=lambda value: value.item())
 
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 import json
+import pickle
 from typing import Optional
 
 import numpy as np
@@ -9,12 +10,18 @@ import sklearn.metrics
 
 from fisseqtools.ovr_select import (
     ovr_hyperparam_search,
+    ovr_predict,
     ovr_select,
     ovr_select_log,
+    ovr_select_log_sgd,
+    ovr_select_multinomial,
     ovr_select_xgboost,
     ovr_select_xgboost_reg,
     ovr_xgb_search_height,
+    predict_ovr,
     train_log_regression,
+    train_log_regression_sgd,
+    train_multinomial,
     train_xgboost,
     train_xgboost_reg,
 )
@@ -34,6 +41,52 @@ def test_train_log_regression():
     assert sklearn.metrics.accuracy_score(y_eval, y_pred) == 1.0
 
 
+def test_train_log_regression_sgd():
+    x_train = np.array([[1, 0, 0]] * 50 + [[0, 1, 0]] * 50).astype(float)
+    y_train = np.array([0] * 50 + [1] * 50)
+    x_eval = np.array([[1, 0, 0]] * 20 + [[0, 1, 0]] * 20).astype(float)
+    y_eval = np.array([0] * 20 + [1] * 20)
+
+    model = train_log_regression_sgd(x_train, y_train, x_eval, y_eval)
+    y_probs = model.predict_proba(x_eval)[:, 1].flatten()
+    y_pred = model.predict(x_eval)
+
+    assert sklearn.metrics.roc_auc_score(y_eval, y_probs) == 1.0
+    assert sklearn.metrics.accuracy_score(y_eval, y_pred) == 1.0
+
+
+def test_train_multinomial():
+    x_train = np.array([[1, 0, 0]] * 50 + [[0, 1, 0]] * 50 + [[0, 0, 1]] * 50)
+    y_train = np.array([0] * 50 + [1] * 50 + [2] * 50)
+    x_eval = np.array([[1, 0, 0]] * 20 + [[0, 1, 0]] * 20 + [[0, 0, 1]] * 20)
+    y_eval = np.array([0] * 20 + [1] * 20 + [2] * 20)
+
+    model = train_multinomial(
+        x_train.astype(float), y_train, x_eval.astype(float), y_eval
+    )
+    y_probs = model.predict_proba(x_eval)
+    y_pred = model.predict(x_eval)
+
+    assert y_probs.shape == (60, 3)
+    assert sklearn.metrics.roc_auc_score(y_eval, y_probs, multi_class="ovr") == 1.0
+    assert sklearn.metrics.accuracy_score(y_eval, y_pred) == 1.0
+
+
+def test_train_multinomial_missing_eval_class():
+    x_train = np.array([[1, 0, 0]] * 50 + [[0, 1, 0]] * 50 + [[0, 0, 1]] * 50)
+    y_train = np.array([0] * 50 + [1] * 50 + [2] * 50)
+    x_eval = np.array([[1, 0, 0]] * 20 + [[0, 1, 0]] * 20)
+    y_eval = np.array([0] * 20 + [1] * 20)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        model = train_multinomial(
+            x_train.astype(float), y_train, x_eval.astype(float), y_eval
+        )
+
+    assert model.predict_proba(x_eval).shape == (40, 3)
+    assert sklearn.metrics.accuracy_score(y_eval, model.predict(x_eval)) == 1.0
+
+
 def test_train_xgboost():
     x_train = np.array([[1, 0, 0]] * 50 + [[0, 1, 0]] * 50).astype(float)
     y_train = np.array([0] * 50 + [1] * 50)
@@ -62,6 +115,26 @@ def test_train_xgboost_reg():
     assert sklearn.metrics.accuracy_score(y_eval, y_pred) == 1.0
 
 
+def test_predict_ovr():
+    x_train = np.array([[1, 0, 0]] * 50 + [[0, 1, 0]] * 50 + [[0, 0, 1]] * 50)
+    y_train = np.array([0] * 50 + [1] * 50 + [2] * 50)
+    x_test = np.array([[0, 0, 1], [1, 0, 0], [0, 1, 0]]).astype(float)
+
+    for train_fun in [train_log_regression, train_xgboost]:
+        classifiers = [
+            train_fun(
+                x_train.astype(float),
+                (y_train == curr_label).astype(int),
+                x_train.astype(float),
+                (y_train == curr_label).astype(int),
+            )
+            for curr_label in range(3)
+        ]
+
+        assert predict_ovr(classifiers, x_test).tolist() == [2, 0, 1]
+        assert predict_ovr(classifiers, x_test, chunk_size=2).tolist() == [2, 0, 1]
+
+
 def test_ovr_select(tmp_path):
     train_df = pd.DataFrame(
         {
@@ -116,6 +189,17 @@ def test_ovr_select(tmp_path):
     assert metrics_file.exists()
     assert predictions_file.exists()
 
+    with open(model_file, "rb") as f:
+        model = pickle.load(f)
+
+    assert len(model["classifiers"]) == 3
+    assert list(model["label_encoder"].classes_) == ["A", "B", "C"]
+    assert predict_ovr(model, features).tolist() == [0, 1, 2]
+
+    ovr_predict(model_file, eval_file, features_file, output_path)
+    ovr_predictions_df = pd.read_csv(output_path / "ovr_predictions.csv")
+    assert ovr_predictions_df["label_predicted"].tolist() == eval_df["label"].tolist()
+
     metrics_df = pd.read_csv(metrics_file)
     print(metrics_df)
     assert "label" in metrics_df.columns
@@ -225,7 +309,13 @@ def test_cli_train_wrappers(tmp_path):
     np.save(features_file, features)
 
     for i, cli_fun in enumerate(
-        [ovr_select_log, ovr_select_xgboost, ovr_select_xgboost_reg]
+        [
+            ovr_select_log,
+            ovr_select_log_sgd,
+            ovr_select_multinomial,
+            ovr_select_xgboost,
+            ovr_select_xgboost_reg,
+        ]
     ):
         output_path = output_path_base / str(i)
         model_file = output_path / "ovr_model.pkl"
@@ -248,6 +338,12 @@ def test_cli_train_wrappers(tmp_path):
         assert metrics_file.exists()
         assert predictions_file.exists()
 
+        with open(model_file, "rb") as f:
+            model = pickle.load(f)
+
+        assert isinstance(model["classifiers"], list)
+        assert predict_ovr(model, features).tolist() == [0, 1, 2]
+
         metrics_df = pd.read_csv(metrics_file)
         print(metrics_df)
         assert "label" in metrics_df.columns
@@ -1,19 +1,134 @@
 import pathlib
 
+import joblib
 import numpy as np
 import pandas as pd
 import pytest
+import sklearn.metrics
+import sklearn.preprocessing
 
 from fisseqtools.utils import (
+    binary_roc_auc,
     compute_pca,
+    encode_labels,
+    encode_splits,
     filter_labels,
     generate_splits,
     get_pca,
+    get_worker_threads,
+    load_features,
+    quantize_features,
+    read_split,
     save_metrics,
     split_data,
 )
 
 
+def test_binary_roc_auc():
+    rng = np.random.default_rng(0)
+    y_true = rng.integers(0, 2, size=200)
+    y_score = np.round(rng.random(200), 1)
+
+    assert np.isclose(
+        binary_roc_auc(y_true, y_score), sklearn.metrics.roc_auc_score(y_true, y_score)
+    )
+    assert binary_roc_auc([0, 0, 1, 1], [0.1, 0.2, 0.3, 0.4]) == 1.0
+    assert binary_roc_auc([0, 0, 1, 1], [0.5, 0.5, 0.5, 0.5]) == 0.5
+
+
+def test_encode_labels():
+    labels = pd.Series(["C", "A", "B", "A", "C"])
+    label_encoder = sklearn.preprocessing.LabelEncoder().fit(labels)
+
+    encoded = encode_labels(label_encoder, labels)
+    assert np.array_equal(encoded, label_encoder.transform(labels))
+    assert np.array_equal(label_encoder.classes_[encoded], labels)
+
+    with pytest.raises(ValueError):
+        encode_labels(label_encoder, ["D"])
+
+
+def test_encode_splits():
+    train_df = pd.DataFrame({"label": ["B", "A", "C", "A"]})
+    eval_df = pd.DataFrame({"label": ["C", "A"]})
+
+    label_encoder, y_train, y_eval = encode_splits("label", train_df, eval_df)
+    assert list(label_encoder.classes_) == ["A", "B", "C"]
+    assert y_train.tolist() == [1, 0, 2, 0]
+    assert y_eval.tolist() == [2, 0]
+
+    with pytest.raises(ValueError):
+        encode_splits("label", train_df, pd.DataFrame({"label": ["D"]}))
+
+
+def test_get_worker_threads(monkeypatch):
+    monkeypatch.setattr(joblib, "cpu_count", lambda: 8)
+
+    assert get_worker_threads(1, 10) == 8
+    assert get_worker_threads(4, 10) == 2
+    assert get_worker_threads(8, 2) == 4
+    assert get_worker_threads(16, 10) == 1
+
+
+def test_load_features(tmp_path):
+    features_path = tmp_path / "features.npy"
+    features = np.asfortranarray(np.arange(20, dtype=np.float64).reshape(5, 4))
+    np.save(features_path, features)
+
+    x_train, x_eval = load_features(features_path, [4, 0, 4], pd.Series([1]))
+    assert np.array_equal(x_train, features[[4, 0, 4]])
+    assert np.array_equal(x_eval, features[[1]])
+
+    for curr_features in (x_train, x_eval):
+        assert curr_features.dtype == np.float32
+        assert curr_features.flags["C_CONTIGUOUS"]
+
+
+def test_quantize_features(tmp_path):
+    features_path = tmp_path / "features.npy"
+    quantized_path = tmp_path / "features_q.npy"
+    features = np.random.default_rng(0).normal(size=(50, 4))
+    features[:, 3] = 0.0
+    np.save(features_path, features)
+
+    quantize_features(features_path, quantized_path, chunk_size=16)
+    assert np.load(quantized_path, mmap_mode="r").dtype == np.int8
+    scale = np.load(tmp_path / "features_q.scale.npy")
+
+    (x_train,) = load_features(quantized_path, np.arange(50))
+    assert x_train.dtype == np.float32
+    assert np.all(np.abs(x_train - features) <= scale / 2 + 1e-6)
+    assert np.all(x_train[:, 3] == 0.0)
+
+    # A plain int8 matrix without a scale sidecar is loaded as-is
+    int8_path = tmp_path / "int8_features.npy"
+    np.save(int8_path, np.arange(12, dtype=np.int8).reshape(3, 4))
+    (x_int8,) = load_features(int8_path, [2, 0])
+    assert x_int8.dtype == np.float32
+    assert x_int8.tolist() == [[8, 9, 10, 11], [0, 1, 2, 3]]
+
+
+def test_read_split(tmp_path):
+    split_path = tmp_path / "split.csv"
+    pd.DataFrame(
+        {"index": [3, 1, 2], "label": ["A", "B", "A"], "value": [0.1, 0.2, 0.3]}
+    ).to_csv(split_path)
+
+    split_df = read_split(split_path, "label")
+    assert list(split_df.columns) == ["index", "label"]
+    assert split_df["index"].tolist() == [3, 1, 2]
+    assert split_df["label"].dtype == "category"
+    assert split_df["label"].tolist() == ["A", "B", "A"]
+
+    # Numeric labels stay numeric and keep their numeric order
+    pd.DataFrame({"index": [0, 1, 2], "label": [10, 2, 10]}).to_csv(split_path)
+    split_df = read_split(split_path, "label")
+    assert split_df["label"].tolist() == [10, 2, 10]
+    assert split_df["label"].cat.categories.tolist() == [2, 10]
+    label_encoder, *_ = encode_splits("label", split_df)
+    assert label_encoder.classes_.tolist() == [2, 10]
+
+
 def test_filter_labels():
     data = pd.DataFrame(
         {
@@ -30,6 +145,18 @@ def test_filter_labels():
     assert len(filtered_data) == 8
 
 
+def test_filter_labels_missing_label():
+    data = pd.DataFrame(
+        {"label": ["A", "A", "B", np.nan, "B", np.nan], "value": range(6)}
+    )
+
+    filtered_data = filter_labels(
+        data, label_col="label", frequency_cutoff=2, random_state=42
+    )
+    assert filtered_data["label"].notna().all()
+    assert sorted(filtered_data["value"]) == [0, 1, 2, 4]
+
+
 def test_split_data():
     data = pd.DataFrame({"label": ["A"] * 50 + ["B"] * 50, "value": range(100)})
 
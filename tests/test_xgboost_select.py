@@ -181,7 +181,7 @@ def test_search_hyperparams(tmp_path):
 
     with open(params_file, "r") as f:
         best_params = json.load(f)
-        # assert "learning_rate" in best_params
+        assert "learning_rate" in best_params
         assert "max_depth" in best_params
 
     with open(model_file, "rb") as f: